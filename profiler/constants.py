@@ -23,6 +23,44 @@ DOT11_SUBTYPE_ASSOC_RESP = 0x01
 DOT11_SUBTYPE_REASSOC_REQ = 0x02
 DOT11_SUBTYPE_AUTH_REQ = 0x0B
 
+# byte offsets into the 802.11 MAC header (after the radiotap header)
+DOT11_ADDR1_OFFSET = 4
+DOT11_ADDR2_OFFSET = 10
+DOT11_ADDR3_OFFSET = 16
+DOT11_SEQ_CTRL_OFFSET = 22
+
+PCAP_NETMASK_UNKNOWN = 0xFFFFFFFF
+
+# AF_PACKET PACKET_MMAP (TPACKET_V3) rx ring from <linux/if_packet.h>
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+RX_RING_BLOCK_SIZE = 1 << 16
+RX_RING_BLOCK_NR = 64
+RX_RING_FRAME_SIZE = 1 << 11
+RX_RING_BLOCK_TIMEOUT = 1  # ms before the kernel hands over a partially filled block
+PACKET_FANOUT = 18
+PACKET_FANOUT_LB = 1
+SNIFFER_WORKERS = 2
+BEACON_SCHED_PRIORITY = 50  # SCHED_FIFO priority for the beacon process
+ADDRESSED_FRAME_CACHE_SIZE = 64  # stations with a cached probe resp and auth frame
+ASSOC_REQ_CACHE_SIZE = 256  # stations whose last assoc req is kept by a sniffer
+
+# response requests from the capture processes to the response Tx process
+RESPONSE_KIND_PROBE_RESP = 0
+RESPONSE_KIND_AUTH = 1
+RESPONSE_RING_SLOTS = 256
+RESPONSE_RING_SLOT_SIZE = 16  # length prefix, kind tag and receiver address
+RESPONSE_TX_BATCH = 64  # most responses handed to a single sendmmsg call
+
+# clock_nanosleep(2) arguments from <time.h>
+CLOCK_MONOTONIC = 1
+TIMER_ABSTIME = 1
+
+SSID_IE_TAG = 0
 POWER_MIN_MAX_IE_TAG = 33  # power capability IE
 SUPPORTED_CHANNELS_IE_TAG = 36  # client supported channels
 HT_CAPABILITIES_IE_TAG = 45  # 802.11n
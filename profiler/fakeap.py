@@ -14,88 +14,152 @@ fake ap code handling beaconing and sniffing for the profiler
 
 # standard library imports
 import datetime
-import inspect
+import errno
+import gc
 import logging
+import mmap
 import multiprocessing
 import os
+import select
 import signal
+import socket
+import struct
 import sys
-from multiprocessing import Lock, Value
-from multiprocessing.queues import Queue
-from time import sleep, time
+from collections import OrderedDict
+from multiprocessing import Array
+from time import monotonic_ns
+from typing import Optional
 
-from scapy.all import (Dot11, Dot11Auth, Dot11Beacon, Dot11Elt, Dot11ProbeResp,
-                       RadioTap)
+from scapy.all import Dot11, Dot11Auth, Dot11Beacon, Dot11ProbeResp, RadioTap
 from scapy.all import conf as scapyconf
-from scapy.all import sniff
+from scapy.data import ETH_P_ALL
+from scapy.utils import str2mac
 
 # app imports
-from .constants import (DOT11_SUBTYPE_ASSOC_REQ, DOT11_SUBTYPE_AUTH_REQ,
+from .constants import (ADDRESSED_FRAME_CACHE_SIZE, ASSOC_REQ_CACHE_SIZE,
+                        BEACON_SCHED_PRIORITY, DOT11_ADDR1_OFFSET,
+                        DOT11_ADDR2_OFFSET, DOT11_SEQ_CTRL_OFFSET,
+                        DOT11_SUBTYPE_ASSOC_REQ, DOT11_SUBTYPE_AUTH_REQ,
                         DOT11_SUBTYPE_BEACON, DOT11_SUBTYPE_PROBE_REQ,
                         DOT11_SUBTYPE_PROBE_RESP, DOT11_SUBTYPE_REASSOC_REQ,
-                        DOT11_TYPE_MANAGEMENT)
-from .helpers import build_fake_frame_ies, get_mac, next_sequence_number
+                        DOT11_TYPE_MANAGEMENT, PACKET_FANOUT, PACKET_FANOUT_LB,
+                        PACKET_RX_RING, PACKET_VERSION, RESPONSE_KIND_AUTH,
+                        RESPONSE_KIND_PROBE_RESP, RESPONSE_TX_BATCH,
+                        RX_RING_BLOCK_NR, RX_RING_BLOCK_SIZE,
+                        RX_RING_BLOCK_TIMEOUT, RX_RING_FRAME_SIZE, SOL_PACKET,
+                        SSID_IE_TAG, TP_STATUS_KERNEL, TP_STATUS_USER,
+                        TPACKET_V3)
+from .helpers import (FakeAPConfig, FrameRing, FrameRingGroup, SequenceNumber,
+                      attach_bpf_filter, build_ssid_bpf_filter,
+                      fill_frame_template, get_radiotap_length,
+                      next_sequence_number, send_frames, sleep_until)
 
 # third party imports
 
+log = logging.getLogger(__name__)
+
+# frame headers are composed with scapy once at import; each process only
+# appends the IEs and patches its own address into these templates
+TEMPLATE_MAC = "aa:aa:aa:aa:aa:aa"
+BEACON_TEMPLATE = bytes(
+    RadioTap()
+    / Dot11(
+        type=DOT11_TYPE_MANAGEMENT,
+        subtype=DOT11_SUBTYPE_BEACON,
+        addr1="ff:ff:ff:ff:ff:ff",
+        addr2=TEMPLATE_MAC,
+        addr3=TEMPLATE_MAC,
+    )
+    / Dot11Beacon(cap=0x1111)
+)
+PROBE_RESPONSE_TEMPLATE = bytes(
+    RadioTap()
+    / Dot11(subtype=DOT11_SUBTYPE_PROBE_RESP, addr2=TEMPLATE_MAC, addr3=TEMPLATE_MAC)
+    / Dot11ProbeResp(cap=0x1111)
+)
+AUTH_TEMPLATE = bytes(
+    RadioTap()
+    / Dot11(subtype=DOT11_SUBTYPE_AUTH_REQ, addr2=TEMPLATE_MAC, addr3=TEMPLATE_MAC)
+    / Dot11Auth(seqnum=0x02)
+)
+
+# kind tags leading the response requests SnifferRx hands to SnifferTx
+PROBE_RESPONSE_KIND = bytes((RESPONSE_KIND_PROBE_RESP,))
+AUTH_KIND = bytes((RESPONSE_KIND_AUTH,))
+
 
 class TxBeacons(multiprocessing.Process):
     """ Handle Tx of fake AP frames """
 
     def __init__(
         self,
-        config: dict,
+        config: FakeAPConfig,
         boot_time: datetime.datetime,
-        lock: Lock,
-        sequence_number: Value,
+        sequence_seed: int,
+        mac: str,
+        frame_ies: Array,
+        cpu: int,
     ):
         super(TxBeacons, self).__init__()
-        self.log = logging.getLogger(inspect.stack()[0][1].split("/")[-1])
+        self.log = log
         self.log.debug("beacon pid: %s; parent pid: %s", os.getpid(), os.getppid())
+        os.sched_setaffinity(0, {cpu})
+        self.log.debug("beacon pid %s pinned to cpu %s", os.getpid(), cpu)
+        try:
+            os.sched_setscheduler(
+                0, os.SCHED_FIFO, os.sched_param(BEACON_SCHED_PRIORITY)
+            )
+        except (AttributeError, OSError):
+            self.log.warning("could not set real-time scheduling for beacons")
         self.boot_time = boot_time
         self.config = config
-        self.sequence_number = sequence_number
-        self.ssid = config.get("GENERAL").get("ssid")
-        self.interface = config.get("GENERAL").get("interface")
-        self.channel = int(config.get("GENERAL").get("channel"))
+        self.sequence_number = SequenceNumber(sequence_seed)
+        self.ssid = config.ssid
+        self.interface = config.interface
+        self.channel = config.channel
         scapyconf.iface = self.interface
         self.l2socket = scapyconf.L2socket(iface=self.interface)
         self.log.debug(self.l2socket.outs)
         self.beacon_interval = 0.102_400
 
-        with lock:
-            self.mac = get_mac(self.interface)
-            dot11 = Dot11(
-                type=DOT11_TYPE_MANAGEMENT,
-                subtype=DOT11_SUBTYPE_BEACON,
-                addr1="ff:ff:ff:ff:ff:ff",
-                addr2=self.mac,
-                addr3=self.mac,
-            )
-            dot11beacon = Dot11Beacon(cap=0x1111)
-            beacon_frame_ies = build_fake_frame_ies(self.config)
-            self.beacon_frame = RadioTap() / dot11 / dot11beacon / beacon_frame_ies
+        self.mac = mac
+        self._mac_bytes = bytes.fromhex(self.mac.replace(":", ""))
+
+        # build the beacon once; only the sequence control field changes per Tx
+        self._beacon_bytes = fill_frame_template(
+            BEACON_TEMPLATE, self._mac_bytes, frame_ies.raw
+        )
+        self._seqctl_offset = (
+            get_radiotap_length(self._beacon_bytes) + DOT11_SEQ_CTRL_OFFSET
+        )
+        # patched and sent through a persistent view so a beacon allocates nothing
+        self._beacon_mv = memoryview(self._beacon_bytes)
 
-        # self.log.debug(f"origin beacon hexdump {hexdump(self.beacon_frame)}")
+        # self.log.debug(f"origin beacon hexdump {hexdump(self._beacon_bytes)}")
+        # the beacon loop allocates next to nothing, so skip collector pauses
+        gc.disable()
         self.log.info("starting beacon transmissions")
         self.every(self.beacon_interval, self.beacon)
 
     def every(self, interval: float, task) -> None:
-        """ Attempt to address beacon drift """
-        start_time = time()
+        """ Run task on absolute monotonic deadlines to avoid beacon drift """
+        interval_ns = round(interval * 1_000_000_000)
+        deadline = monotonic_ns()
         while True:
             task()
-            sleep(interval - ((time() - start_time) % interval))
+            deadline += interval_ns
+            late = monotonic_ns() - deadline
+            if late > 0:
+                # skip missed ticks instead of bursting beacons to catch up
+                deadline += (late // interval_ns + 1) * interval_ns
+            sleep_until(deadline)
 
     def beacon(self) -> None:
         """ Update and Tx Beacon Frame """
-        frame = self.beacon_frame
-        with self.sequence_number.get_lock():
-            frame.sequence_number = next_sequence_number(self.sequence_number)
-
-        # print(f"frame.sequence_number: {frame.sequence_number}")
-        # frame.sequence_number value is updating here, but not updating in pcap for some adapters
-        # this appears to impact MediaTek adapters vs RealTek
+        sequence_number = next_sequence_number(self.sequence_number)
+        struct.pack_into(
+            "<H", self._beacon_mv, self._seqctl_offset, sequence_number << 4
+        )
 
         # ts = int((datetime.now().timestamp() - self.boot_time) * 1000000)
         # frame[Dot11Beacon].timestamp = ts
@@ -113,7 +177,7 @@ class TxBeacons(multiprocessing.Process):
         # scapy is doing something werid with our timestamps.
         # pcap shows wrong timestamp values
         try:
-            self.l2socket.send(frame)
+            self.l2socket.outs.send(self._beacon_mv)
         except OSError as error:
             for event in ("Network is down", "No such device"):
                 if event in error.strerror:
@@ -121,109 +185,340 @@ class TxBeacons(multiprocessing.Process):
                     sys.exit(signal.SIGTERM)
 
 
-class Sniffer(multiprocessing.Process):
+class SnifferRx(multiprocessing.Process):
     """ Handle sniffing probes and association requests """
 
     def __init__(
         self,
-        config: dict,
+        config: FakeAPConfig,
         boot_time: datetime.datetime,
-        lock: Lock,
-        sequence_number: Value,
-        queue: Queue,
+        mac: str,
+        queue: FrameRing,
+        responses: FrameRing,
         args,
+        fanout_id: int,
+        cpu: int,
     ):
-        super(Sniffer, self).__init__()
-        self.log = logging.getLogger(inspect.stack()[0][1].split("/")[-1])
+        super(SnifferRx, self).__init__()
+        self.log = log
         self.log.debug("sniffer pid: %s; parent pid: %s", os.getpid(), os.getppid())
+        os.sched_setaffinity(0, {cpu})
+        self.log.debug("sniffer pid %s pinned to cpu %s", os.getpid(), cpu)
 
         self.queue = queue
+        # probe resp and auth Tx is left to SnifferTx so capture never waits on it
+        self.responses = responses
         self.boot_time = boot_time
         self.config = config
-        self.sequence_number = sequence_number
-        self.ssid = config.get("GENERAL").get("ssid")
-        self.interface = config.get("GENERAL").get("interface")
-        self.channel = int(config.get("GENERAL").get("channel"))
-        self.listen_only = config.get("GENERAL").get("listen_only")
-        self.assoc_reqs = {}
-
-        self.bpf_filter = "type mgt subtype probe-req or type mgt subtype auth or type mgt subtype assoc-req or type mgt subtype reassoc-req"
-        if args.no_sniffer_filter:
-            self.bpf_filter = ""
+        self.ssid = config.ssid
+        self.interface = config.interface
+        self.channel = config.channel
+        self.listen_only = config.listen_only
+        # last assoc req per station, keyed on the raw transmitter address
+        self.assoc_reqs = OrderedDict()
+
         # mgt bpf filter: assoc-req, assoc-resp, reassoc-req, reassoc-resp, probe-req, probe-resp, beacon, atim, disassoc, auth, deauth
         # ctl bpf filter: ps-poll, rts, cts, ack, cf-end, cf-end-ack
-        scapyconf.iface = self.interface
-        self.l2socket = scapyconf.L2socket(iface=self.interface)
-        self.log.debug(self.l2socket.outs)
 
         self.received_frame_cb = self.received_frame
         self.dot11_probe_request_cb = self.probe_response
         self.dot11_assoc_request_cb = self.assoc_req
         self.dot11_auth_cb = self.auth
-        with lock:
-            probe_resp_ies = build_fake_frame_ies(self.config)
-            self.mac = get_mac(self.interface)
-            self.probe_response_frame = (
-                RadioTap()
-                / Dot11(
-                    subtype=DOT11_SUBTYPE_PROBE_RESP, addr2=self.mac, addr3=self.mac
-                )
-                / Dot11ProbeResp(cap=0x1111)
-                / probe_resp_ies
-            )
-            self.auth_frame = (
-                RadioTap()
-                / Dot11(subtype=DOT11_SUBTYPE_AUTH_REQ, addr2=self.mac, addr3=self.mac)
-                / Dot11Auth(seqnum=0x02)
+        self.build_dispatch_table()
+        self.mac = mac
+        self._mac_bytes = bytes.fromhex(self.mac.replace(":", ""))
+        # addr1 checks compare one int instead of six bytes
+        self._mac_int = int.from_bytes(self._mac_bytes, "big")
+        self._ssid_bytes = bytes(self.ssid, "utf-8")
+        self._ssid_length = len(self._ssid_bytes)
+
+        # let the kernel drop everything but the frames we respond to or profile
+        if args.no_sniffer_filter:
+            bpf_filter = ""
+        else:
+            receiver = "" if self.listen_only else f" and wlan addr1 {self.mac}"
+            bpf_filter = (
+                f"(type mgt subtype probe-req and {build_ssid_bpf_filter(self.ssid)})"
+                f" or (type mgt subtype auth and wlan addr1 {self.mac})"
+                " or ((type mgt subtype assoc-req or type mgt subtype reassoc-req)"
+                f"{receiver})"
             )
+        self.open_rx_ring(bpf_filter, fanout_id)
+        self.sniff()
 
-        sniff(
-            iface=self.interface,
-            prn=self.received_frame_cb,
-            store=0,
-            filter=self.bpf_filter,
+    def open_rx_ring(self, bpf_filter: str, fanout_id: int = None) -> None:
+        """ Open a raw socket on the interface with a PACKET_MMAP rx ring """
+        # protocol 0 receives nothing until bind, so no frames skip the filter
+        self.rx_socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        if bpf_filter:
+            attach_bpf_filter(self.rx_socket, bpf_filter)
+        self.rx_socket.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+        frame_nr = RX_RING_BLOCK_SIZE // RX_RING_FRAME_SIZE * RX_RING_BLOCK_NR
+        self.rx_socket.setsockopt(
+            SOL_PACKET,
+            PACKET_RX_RING,
+            struct.pack(
+                "=IIIIIII",
+                RX_RING_BLOCK_SIZE,
+                RX_RING_BLOCK_NR,
+                RX_RING_FRAME_SIZE,
+                frame_nr,
+                RX_RING_BLOCK_TIMEOUT,
+                0,
+                0,
+            ),
         )
+        self.rx_ring = mmap.mmap(
+            self.rx_socket.fileno(), RX_RING_BLOCK_SIZE * RX_RING_BLOCK_NR
+        )
+        self.rx_socket.bind((self.interface, ETH_P_ALL))
+        if fanout_id is not None:
+            # the kernel round robins frames across every sniffer in the group
+            self.rx_socket.setsockopt(
+                SOL_PACKET, PACKET_FANOUT, fanout_id | PACKET_FANOUT_LB << 16
+            )
+
+    def sniff(self) -> None:
+        """ Walk the rx ring block by block, handing each frame to received_frame """
+        ring = self.rx_ring
+        poller = select.poll()
+        poller.register(self.rx_socket, select.POLLIN | select.POLLERR)
+        block = 0
+        while True:
+            offset = block * RX_RING_BLOCK_SIZE
+            # struct tpacket_block_desc: block_status, num_pkts, offset_to_first_pkt
+            status, num_pkts, packet = struct.unpack_from("=III", ring, offset + 8)
+            if not status & TP_STATUS_USER:
+                for _, events in poller.poll():
+                    if events & select.POLLERR:
+                        self.check_socket_error()
+                continue
+            packet += offset
+            for _ in range(num_pkts):
+                # struct tpacket3_hdr: tp_next_offset, ..., tp_snaplen, ..., tp_mac
+                next_offset, snaplen, mac = struct.unpack_from(
+                    "=I8xI8xH", ring, packet
+                )
+                start = packet + mac
+                end = start + snaplen
+                self.received_frame_cb(ring[start:end])
+                packet += next_offset
+            struct.pack_into("=I", ring, offset + 8, TP_STATUS_KERNEL)
+            block = (block + 1) % RX_RING_BLOCK_NR
+
+    def check_socket_error(self) -> None:
+        """ Read the pending rx socket error and exit if the interface went away """
+        error = self.rx_socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error in (errno.ENETDOWN, errno.ENODEV):
+            self.log.error("%s: %s, exiting...", self.interface, os.strerror(error))
+            sys.exit(signal.SIGTERM)
+        if error:
+            self.log.warning("%s: %s", self.interface, os.strerror(error))
 
-    def received_frame(self, packet) -> None:
-        """ Handle incoming packets for profiling """
-        if packet.subtype == DOT11_SUBTYPE_AUTH_REQ:  # auth
-            if packet.addr1 == self.mac:  # if we are the receiver
-                self.dot11_auth_cb(packet.addr2)
-        elif packet.subtype == DOT11_SUBTYPE_PROBE_REQ:
-            ssid = packet[Dot11Elt].info.decode()
-            # self.log.debug("probe req for %s by MAC %s", ssid, packet.addr)
-            if ssid == self.ssid or packet[Dot11Elt].len == 0:
-                self.dot11_probe_request_cb(packet)
-        elif (
-            packet.subtype == DOT11_SUBTYPE_ASSOC_REQ
-            or packet.subtype == DOT11_SUBTYPE_REASSOC_REQ
+    def build_dispatch_table(self) -> None:
+        """ Map the type and subtype bits of frame control to a frame handler """
+        self._dispatch = [self._ignore_frame] * 64
+        for subtype, handler in (
+            (DOT11_SUBTYPE_AUTH_REQ, self._received_auth),
+            (DOT11_SUBTYPE_PROBE_REQ, self._received_probe_req),
+            (DOT11_SUBTYPE_ASSOC_REQ, self._received_assoc_req),
+            (DOT11_SUBTYPE_REASSOC_REQ, self._received_assoc_req),
         ):
-            if packet.addr1 == self.mac:  # if we are the receiver
-                self.dot11_assoc_request_cb(packet)
-            if self.listen_only:
-                self.dot11_assoc_request_cb(packet)
+            self._dispatch[subtype << 2 | DOT11_TYPE_MANAGEMENT] = handler
 
-    def probe_response(self, probe_request) -> None:
-        """ Send probe resp to assist with profiler discovery """
-        frame = self.probe_response_frame
-        with self.sequence_number.get_lock():
-            frame.sequence_number = next_sequence_number(self.sequence_number)
-        frame[Dot11].addr1 = probe_request.addr2
-        self.l2socket.send(frame)
-        # self.log.debug("sent probe resp to %s", probe_request.addr2)
-
-    def assoc_req(self, frame) -> None:
+    def received_frame(self, frame: bytes) -> None:
+        """ Handle incoming frames for profiling """
+        rtap_len = get_radiotap_length(frame)
+        if len(frame) < rtap_len + 24:
+            return
+        # index the handler table by the type and subtype bits of frame control
+        self._dispatch[frame[rtap_len] >> 2](frame, rtap_len)
+
+    def _ignore_frame(self, frame: bytes, rtap_len: int) -> None:
+        """ Drop frames we have no handler for """
+
+    def _received_auth(self, frame: bytes, rtap_len: int) -> None:
+        """ Answer auth frames sent to us """
+        addr1 = rtap_len + DOT11_ADDR1_OFFSET
+        addr1_end = addr1 + 6
+        if int.from_bytes(frame[addr1:addr1_end], "big") == self._mac_int:
+            # we are the receiver
+            addr2 = rtap_len + DOT11_ADDR2_OFFSET
+            addr2_end = addr2 + 6
+            self.dot11_auth_cb(frame[addr2:addr2_end])
+
+    def _received_probe_req(self, frame: bytes, rtap_len: int) -> None:
+        """ Answer probe reqs for our SSID or the wildcard SSID """
+        # the SSID element leads the probe req body
+        ssid = rtap_len + 24
+        if len(frame) < ssid + 2 or frame[ssid] != SSID_IE_TAG:
+            return
+        # compare lengths first, most foreign SSIDs stop here without a slice
+        length = frame[ssid + 1]
+        start = ssid + 2
+        end = start + length
+        if length == 0 or (
+            length == self._ssid_length and frame[start:end] == self._ssid_bytes
+        ):
+            addr2 = rtap_len + DOT11_ADDR2_OFFSET
+            addr2_end = addr2 + 6
+            self.dot11_probe_request_cb(frame[addr2:addr2_end])
+
+    def _received_assoc_req(self, frame: bytes, rtap_len: int) -> None:
+        """ Queue (re)assoc reqs sent to us, or any of them when listening only """
+        addr1 = rtap_len + DOT11_ADDR1_OFFSET
+        addr1_end = addr1 + 6
+        if (
+            self.listen_only
+            or int.from_bytes(frame[addr1:addr1_end], "big") == self._mac_int
+        ):
+            self.dot11_assoc_request_cb(frame)
+
+    def request_response(self, kind: bytes, receiver: bytes) -> None:
+        """ Hand a response for receiver to SnifferTx """
+        if not self.responses.put(kind + receiver):
+            self.log.debug("response ring full, dropping Tx to %s", str2mac(receiver))
+
+    def probe_response(self, receiver: bytes) -> None:
+        """ Request a probe resp to assist with profiler discovery """
+        self.request_response(PROBE_RESPONSE_KIND, receiver)
+
+    def assoc_req(self, frame: bytes) -> None:
         """ Put association request on queue for the Profiler """
-        self.assoc_reqs[frame.addr2] = frame
-        self.log.debug("adding assoc req from %s to queue", frame.addr2)
-        self.queue.put(frame)
+        addr2_offset = get_radiotap_length(frame) + DOT11_ADDR2_OFFSET
+        addr2_end = addr2_offset + 6
+        addr2 = frame[addr2_offset:addr2_end]
+        self.assoc_reqs[addr2] = frame
+        self.assoc_reqs.move_to_end(addr2)
+        if len(self.assoc_reqs) > ASSOC_REQ_CACHE_SIZE:
+            self.assoc_reqs.popitem(last=False)
+        self.log.debug("adding assoc req from %s to queue", str2mac(addr2))
+        if not self.queue.put(frame):
+            self.log.warning("queue full, dropping assoc req from %s", str2mac(addr2))
 
-    def auth(self, receiver) -> None:
-        """ Send authentication frame to get the station to prompt an assoc request """
-        frame = self.auth_frame
-        frame[Dot11].addr1 = receiver
-        with self.sequence_number.get_lock():
-            frame.sequence_number = next_sequence_number(self.sequence_number) - 1
+    def auth(self, receiver: bytes) -> None:
+        """ Request an auth frame to get the station to prompt an assoc request """
+        self.request_response(AUTH_KIND, receiver)
+
+
+class SnifferTx(multiprocessing.Process):
+    """ Handle Tx of the probe resps and auths requested by the sniffers """
+
+    def __init__(
+        self,
+        config: FakeAPConfig,
+        sequence_seed: int,
+        mac: str,
+        frame_ies: Array,
+        responses: FrameRingGroup,
+        cpu: int,
+    ):
+        super(SnifferTx, self).__init__()
+        self.log = log
+        self.log.debug("sniffer tx pid: %s; parent pid: %s", os.getpid(), os.getppid())
+        os.sched_setaffinity(0, {cpu})
+        self.log.debug("sniffer tx pid %s pinned to cpu %s", os.getpid(), cpu)
+
+        self.responses = responses
+        self.config = config
+        self.sequence_number = SequenceNumber(sequence_seed)
+        self.interface = config.interface
+        scapyconf.iface = self.interface
+        self.l2socket = scapyconf.L2socket(iface=self.interface)
+        self.log.debug(self.l2socket.outs)
 
-        # self.log.debug("sending authentication (0x0B) to %s", receiver)
-        self.l2socket.send(frame)
+        self.mac = mac
+        self._mac_bytes = bytes.fromhex(self.mac.replace(":", ""))
+
+        # prebuilt frames; addr1 and sequence control are patched in place per Tx
+        self._probe_response_bytes = fill_frame_template(
+            PROBE_RESPONSE_TEMPLATE, self._mac_bytes, frame_ies.raw
+        )
+        rtap_len = get_radiotap_length(self._probe_response_bytes)
+        self._probe_response_addr1_offset = rtap_len + DOT11_ADDR1_OFFSET
+        self._probe_response_seqctl_offset = rtap_len + DOT11_SEQ_CTRL_OFFSET
+        self._auth_bytes = fill_frame_template(AUTH_TEMPLATE, self._mac_bytes)
+        rtap_len = get_radiotap_length(self._auth_bytes)
+        self._auth_addr1_offset = rtap_len + DOT11_ADDR1_OFFSET
+        self._auth_seqctl_offset = rtap_len + DOT11_SEQ_CTRL_OFFSET
+        # responses waiting in the rings are batched and sent with sendmmsg
+        self.tx_frames = []
+        # chatty stations get their own pre-addressed copy of each frame
+        self._probe_response_cache = OrderedDict()
+        self._auth_cache = OrderedDict()
+        # keyed by the kind tag leading each response request
+        self._responders = {
+            PROBE_RESPONSE_KIND[0]: self.probe_response,
+            AUTH_KIND[0]: self.auth,
+        }
+
+        self.transmit()
+
+    def transmit(self) -> None:
+        """ Wait for response requests and send whatever has queued up in one go """
+        while True:
+            self.queue_responses(self.responses.get())
+            self.flush_tx_frames()
+
+    def queue_responses(self, request: Optional[bytes]) -> None:
+        """ Queue the frames for request and the requests behind it, up to a batch """
+        while request is not None:
+            self._responders[request[0]](request[1:])
+            if len(self.tx_frames) >= RESPONSE_TX_BATCH:
+                break
+            request = self.responses.get(block=False)
+
+    def flush_tx_frames(self) -> None:
+        """ Send the queued responses in one syscall """
+        try:
+            send_frames(self.l2socket.outs, self.tx_frames)
+        finally:
+            self.tx_frames.clear()
+
+    def queue_tx_frame(
+        self, frame: memoryview, seqctl_offset: int, sequence_number: int
+    ) -> None:
+        """ Stamp a sequence number on a cached frame and queue it for the batch """
+        # the station's frame may still be waiting; send it before re-stamping
+        if any(queued is frame for queued in self.tx_frames):
+            self.flush_tx_frames()
+        struct.pack_into("<H", frame, seqctl_offset, sequence_number << 4)
+        self.tx_frames.append(frame)
+
+    @staticmethod
+    def get_addressed_frame(
+        cache: OrderedDict, template: bytearray, addr1_offset: int, receiver: bytes
+    ) -> memoryview:
+        """ Get a view of a copy of template addressed to receiver from an LRU cache """
+        frame = cache.get(receiver)
+        if frame is None:
+            frame = memoryview(bytearray(template))
+            addr1_end = addr1_offset + 6
+            frame[addr1_offset:addr1_end] = receiver
+            cache[receiver] = frame
+            if len(cache) > ADDRESSED_FRAME_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(receiver)
+        return frame
+
+    def probe_response(self, receiver: bytes) -> None:
+        """ Send probe resp to assist with profiler discovery """
+        frame = self.get_addressed_frame(
+            self._probe_response_cache,
+            self._probe_response_bytes,
+            self._probe_response_addr1_offset,
+            receiver,
+        )
+        sequence_number = next_sequence_number(self.sequence_number)
+        self.queue_tx_frame(frame, self._probe_response_seqctl_offset, sequence_number)
+        # self.log.debug("sent probe resp to %s", str2mac(receiver))
+
+    def auth(self, receiver: bytes) -> None:
+        """ Send authentication frame to get the station to prompt an assoc request """
+        frame = self.get_addressed_frame(
+            self._auth_cache, self._auth_bytes, self._auth_addr1_offset, receiver
+        )
+        sequence_number = (next_sequence_number(self.sequence_number) - 1) % 4096
+        self.queue_tx_frame(frame, self._auth_seqctl_offset, sequence_number)
+        # self.log.debug("sending authentication (0x0B) to %s", str2mac(receiver))
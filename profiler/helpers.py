@@ -15,6 +15,8 @@ provides init functions that are used to help setup the app.
 # standard library imports
 import argparse
 import configparser
+import ctypes
+import errno
 import inspect
 import json
 import logging
@@ -24,20 +26,24 @@ import re
 import shutil
 import signal
 import socket
+import struct
 import subprocess
 import sys
 from base64 import b64encode
 from dataclasses import dataclass
 from distutils.util import strtobool
-from multiprocessing import Value
-from time import ctime
-from typing import Union
+from multiprocessing import RawArray, Semaphore, Value
+from time import ctime, monotonic_ns, sleep
+from typing import List, Optional, Union
 
 # third party imports
 try:
     import manuf
-    from scapy.all import (Dot11Elt, Scapy_Exception, get_if_hwaddr,
-                           get_if_raw_hwaddr)
+    from scapy.all import (Dot11AssoReq, Dot11Elt, RadioTap, Scapy_Exception,
+                           get_if_hwaddr, get_if_raw_hwaddr)
+    from scapy.data import DLT_IEEE802_11_RADIO, MTU, SO_ATTACH_FILTER
+    from scapy.libs.structures import bpf_program
+    from scapy.libs.winpcapy import pcap_compile_nopcap, pcap_freecode
 except ModuleNotFoundError as error:
     if error.name == "manuf":
         print("required module manuf not found. try installing manuf.")
@@ -48,6 +54,10 @@ except ModuleNotFoundError as error:
     else:
         print(f"{error}")
     sys.exit(signal.SIGABRT)
+except OSError:
+    # scapy loads libpcap to compile the sniffer BPF filters
+    print("problem loading libpcap. is libpcap installed and functioning? exiting...")
+    sys.exit(signal.SIGABRT)
 
 # is tcpdump installed?
 try:
@@ -73,11 +83,68 @@ except OSError:
 
 # app imports
 from .__version__ import __version__
-from .constants import CHANNELS, CONFIG_FILE
+from .constants import (CHANNELS, CLOCK_MONOTONIC, CONFIG_FILE,
+                        DOT11_ADDR2_OFFSET, DOT11_ADDR3_OFFSET,
+                        PCAP_NETMASK_UNKNOWN, TIMER_ABSTIME)
 
 FILES_PATH = "/var/www/html/profiler"
 
 
+class Timespec(ctypes.Structure):
+    """ struct timespec from <time.h> """
+
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class IOVec(ctypes.Structure):
+    """ struct iovec from <sys/uio.h> """
+
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    """ struct msghdr from <sys/socket.h> """
+
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class MMsgHdr(ctypes.Structure):
+    """ struct mmsghdr from <sys/socket.h> """
+
+    _fields_ = [("msg_hdr", MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+try:
+    _sendmmsg = ctypes.CDLL(None).sendmmsg
+    _sendmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(MMsgHdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+    ]
+except (OSError, AttributeError):
+    _sendmmsg = None
+
+try:
+    _clock_nanosleep = ctypes.CDLL(None).clock_nanosleep
+    _clock_nanosleep.argtypes = [
+        ctypes.c_int,
+        ctypes.c_int,
+        ctypes.POINTER(Timespec),
+        ctypes.POINTER(Timespec),
+    ]
+except (OSError, AttributeError):
+    _clock_nanosleep = None
+
+
 def setup_logger(args) -> None:
     """ Configure and set logging levels """
     if args.logging:
@@ -577,6 +644,21 @@ def verify_reporting_directories(config: dict) -> None:
             log.debug(os.makedirs(reports_dir))
 
 
+def get_assoc_reqs(frames: list) -> List[bytes]:
+    """ Extract the radiotap association requests from frames read from a pcap """
+    log = logging.getLogger(inspect.stack()[0][3])
+    assoc_reqs = []
+    for frame in frames:
+        if not frame.haslayer(Dot11AssoReq):
+            continue
+        if isinstance(frame, RadioTap):
+            assoc_reqs.append(bytes(frame))
+        else:
+            # the profiler reads the channel from the radiotap header
+            log.warning("skipping assoc req with unsupported link type")
+    return assoc_reqs
+
+
 def get_frequency_bytes(channel: int) -> bytes:
     """ Take a channel number, converts it to a frequency, and finally to bytes """
     if channel == 14:
@@ -751,12 +833,137 @@ def flag_last_object(seq: iter):
     yield _a, True
 
 
-def next_sequence_number(sequence_number: Value) -> int:
-    """ Update a sequence number of type multiprocessing Value """
+class SequenceNumber:
+    """ A 12-bit 802.11 sequence number owned by a single Tx process
+
+    Each Tx process counts from its own seed instead of sharing one counter, so
+    no read-modify-write ever crosses a process boundary.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, seed: int = 0):
+        self.value = seed % 4096
+
+
+def next_sequence_number(sequence_number: Union[Value, SequenceNumber]) -> int:
+    """ Update a sequence number of type multiprocessing Value or SequenceNumber """
     sequence_number.value = (sequence_number.value + 1) % 4096
     return sequence_number.value
 
 
+def spread_sequence_seeds(count: int) -> List[int]:
+    """ Spread the starting sequence numbers of count Tx processes evenly """
+    return [4096 * index // count for index in range(count)]
+
+
+def sleep_until(deadline: int) -> None:
+    """ Sleep until an absolute CLOCK_MONOTONIC deadline in nanoseconds """
+    if _clock_nanosleep is None:
+        remaining = deadline - monotonic_ns()
+        if remaining > 0:
+            sleep(remaining / 1_000_000_000)
+        return
+    request = Timespec(deadline // 1_000_000_000, deadline % 1_000_000_000)
+    while (
+        _clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, ctypes.byref(request), None)
+        == errno.EINTR
+    ):
+        pass
+
+
+def build_ssid_bpf_filter(ssid: str) -> str:
+    """ Build a BPF expression matching probe reqs for an SSID or the wildcard SSID """
+    ssid = bytes(ssid, "utf-8")
+    # the SSID element is the first IE after the 24 byte header of a probe req
+    matches = [f"wlan[25] = {len(ssid)}"]
+    offset = 0
+    while offset < len(ssid):
+        size = next(size for size in (4, 2, 1) if size <= len(ssid) - offset)
+        end = offset + size
+        value = int.from_bytes(ssid[offset:end], byteorder="big")
+        matches.append(f"wlan[{26 + offset}:{size}] = {value:#x}")
+        offset += size
+    return f"wlan[24] = 0 and (wlan[25] = 0 or ({' and '.join(matches)}))"
+
+
+def attach_bpf_filter(sock: socket.socket, filter_exp: str) -> None:
+    """ Compile an optimized BPF program for radiotap frames and attach it to a socket """
+    program = bpf_program()
+    if (
+        pcap_compile_nopcap(
+            MTU,
+            DLT_IEEE802_11_RADIO,
+            ctypes.byref(program),
+            filter_exp.encode(),
+            1,
+            PCAP_NETMASK_UNKNOWN,
+        )
+        < 0
+    ):
+        raise ValueError(f"could not compile BPF filter: {filter_exp}")
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, program)
+    finally:
+        pcap_freecode(ctypes.byref(program))
+
+
+def send_frames(
+    sock: socket.socket, frames: List[Union[bytearray, memoryview]]
+) -> None:
+    """ Send frames on a bound socket with a single sendmmsg(2) call """
+    count = len(frames)
+    sent = 0
+    if _sendmmsg is not None and count > 1:
+        buffers = [(ctypes.c_char * len(frame)).from_buffer(frame) for frame in frames]
+        iovecs = (IOVec * count)()
+        messages = (MMsgHdr * count)()
+        for index, buffer in enumerate(buffers):
+            iovecs[index].iov_base = ctypes.addressof(buffer)
+            iovecs[index].iov_len = len(buffer)
+            messages[index].msg_hdr.msg_iov = ctypes.pointer(iovecs[index])
+            messages[index].msg_hdr.msg_iovlen = 1
+        sent = max(_sendmmsg(sock.fileno(), messages, count, 0), 0)
+        del buffers
+    # sendmmsg stops at the first error; send the rest one by one to raise it
+    for frame in frames[sent:]:
+        sock.send(frame)
+
+
+def get_radiotap_length(frame: Union[bytes, bytearray]) -> int:
+    """ Get the length of the radiotap header prefixing a raw frame """
+    return int.from_bytes(frame[2:4], byteorder="little")
+
+
+def fill_frame_template(template: bytes, mac: bytes, ies: bytes = b"") -> bytearray:
+    """ Copy a frame template with our IEs appended and our address as addr2/addr3 """
+    frame = bytearray(template + ies)
+    rtap_len = get_radiotap_length(frame)
+    struct.pack_into("6s", frame, rtap_len + DOT11_ADDR2_OFFSET, mac)
+    struct.pack_into("6s", frame, rtap_len + DOT11_ADDR3_OFFSET, mac)
+    return frame
+
+
+def get_physical_cpus() -> List[int]:
+    """ Get one usable CPU per physical core, skipping hyperthread siblings """
+    cpus = []
+    siblings = set()
+    for cpu in sorted(os.sched_getaffinity(0)):
+        if cpu in siblings:
+            continue
+        cpus.append(cpu)
+        try:
+            with open(
+                f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"
+            ) as _file:
+                for cpu_range in _file.read().strip().split(","):
+                    first, _, last = cpu_range.partition("-")
+                    siblings.update(range(int(first), int(last or first) + 1))
+        except OSError:
+            pass
+    return cpus
+
+
 def get_mac(interface: str) -> str:
     """ Get the mac address for a specified interface """
     try:
@@ -815,6 +1022,109 @@ def generate_run_message(config: dict) -> None:
         print(f"{'#' * 100}\n")
 
 
+class FrameRing:
+    """ Single producer, single consumer ring of raw frames in shared memory
+
+    Slots hold a little-endian length prefix followed by the frame bytes. The
+    producer owns the tail index and the consumer owns the head index; the
+    semaphore counts filled slots so the consumer can block instead of spin.
+    """
+
+    _HEAD = 0
+    _TAIL = 8  # keep the indices on separate 64-byte cache lines
+
+    def __init__(self, slots: int = 64, slot_size: int = 4096, filled=None):
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.slots = slots
+        self.slot_size = slot_size
+        self._buffer = RawArray(ctypes.c_ubyte, slots * slot_size)
+        self._indices = RawArray(ctypes.c_uint64, 16)
+        self._filled = Semaphore(0) if filled is None else filled
+
+    def put(self, frame: bytes) -> bool:
+        """ Copy a frame into the ring, returns False if it is full or the frame is too big """
+        length = len(frame)
+        if length > self.slot_size - 2:
+            return False
+        tail = self._indices[self._TAIL]
+        if tail - self._indices[self._HEAD] >= self.slots:
+            return False
+        offset = (tail & (self.slots - 1)) * self.slot_size
+        struct.pack_into("<H", self._buffer, offset, length)
+        ctypes.memmove(ctypes.addressof(self._buffer) + offset + 2, frame, length)
+        self._indices[self._TAIL] = tail + 1
+        self._filled.release()
+        return True
+
+    def get(self, block: bool = True, timeout: float = None) -> Optional[bytes]:
+        """ Take the oldest frame from the ring, returns None if none arrived in time """
+        if not self._filled.acquire(block, timeout):
+            return None
+        return self._take()
+
+    def _take(self) -> bytes:
+        """ Read the frame at the head once the filled semaphore was acquired """
+        head = self._indices[self._HEAD]
+        offset = (head & (self.slots - 1)) * self.slot_size
+        (length,) = struct.unpack_from("<H", self._buffer, offset)
+        frame = ctypes.string_at(ctypes.addressof(self._buffer) + offset + 2, length)
+        self._indices[self._HEAD] = head + 1
+        return frame
+
+    def empty(self) -> bool:
+        """ Is the ring empty? """
+        return self._indices[self._HEAD] == self._indices[self._TAIL]
+
+
+class FrameRingGroup:
+    """ One FrameRing per producer, read by a single consumer
+
+    The rings share one filled semaphore, so a consumer wakes for a frame
+    from any producer and then reads the rings round robin.
+    """
+
+    def __init__(self, count: int, slots: int = 64, slot_size: int = 4096):
+        self._filled = Semaphore(0)
+        self.rings = [FrameRing(slots, slot_size, self._filled) for _ in range(count)]
+        self._next = 0
+
+    def get(self, block: bool = True, timeout: float = None) -> Optional[bytes]:
+        """ Take the next frame from any ring, returns None if none arrived in time """
+        if not self._filled.acquire(block, timeout):
+            return None
+        while True:
+            ring = self.rings[self._next]
+            self._next = (self._next + 1) % len(self.rings)
+            if not ring.empty():
+                return ring._take()
+
+    def empty(self) -> bool:
+        """ Are all rings empty? """
+        return all(ring.empty() for ring in self.rings)
+
+
+@dataclass(frozen=True)
+class FakeAPConfig:
+    """ The config values needed by the fake AP processes """
+
+    ssid: str
+    interface: str
+    channel: int
+    listen_only: bool = False
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FakeAPConfig":
+        """ Pick the fake AP values out of the full config dict """
+        general = config.get("GENERAL")
+        return cls(
+            ssid=general.get("ssid"),
+            interface=general.get("interface"),
+            channel=int(general.get("channel")),
+            listen_only=bool(general.get("listen_only")),
+        )
+
+
 @dataclass
 class Capability:
     """ Define custom fields for reporting """
@@ -31,6 +31,8 @@ from scapy.all import rdpcap
 # app imports
 from . import helpers
 from .__version__ import __version__
+from .constants import (RESPONSE_RING_SLOT_SIZE, RESPONSE_RING_SLOTS,
+                        SNIFFER_WORKERS)
 
 
 def signal_handler(signum, frame):
@@ -91,7 +93,6 @@ def start(args: argparse.Namespace):
 
     processes = []
     finished_processes = []
-    queue = mp.Queue()
     pcap_analysis = config.get("GENERAL").get("pcap_analysis")
     parent_pid = os.getpid()
     log.debug("%s pid %s", __name__, parent_pid)
@@ -108,11 +109,17 @@ def start(args: argparse.Namespace):
             print("exiting...")
             sys.exit(-1)
 
-        for frame in frames:
-            # extract frames that are Dot11
-            if frame.haslayer(scapy.layers.dot11.Dot11AssoReq):
-                # put frame into the multiprocessing queue for the profiler to analyze
-                queue.put(frame)
+        assoc_reqs = helpers.get_assoc_reqs(frames)
+        # size the ring so every association request in the pcap fits
+        queue = helpers.FrameRing(
+            slots=1 << max(len(assoc_reqs) - 1, 0).bit_length()
+        )
+        for assoc_req in assoc_reqs:
+            # put frame into the shared ring for the profiler to analyze
+            if not queue.put(assoc_req):
+                log.warning(
+                    "skipping %s byte assoc req, too big for the queue", len(assoc_req)
+                )
     else:
         if helpers.validate(config):
             log.debug("config %s", config)
@@ -124,12 +131,26 @@ def start(args: argparse.Namespace):
         channel = int(config.get("GENERAL").get("channel"))
         listen_only = config.get("GENERAL").get("listen_only")
 
-        from .fakeap import Sniffer, TxBeacons
+        from .fakeap import SnifferRx, SnifferTx, TxBeacons
 
+        cpus = helpers.get_physical_cpus()
+        # beacons and response Tx get the first cores, sniffers take the last
+        beacon_cpu = cpus[0]
+        sniffer_tx_cpu = cpus[min(1, len(cpus) - 1)]
+        sniffer_workers = min(SNIFFER_WORKERS, max(len(cpus) - 2, 1))
+        queue = helpers.FrameRingGroup(sniffer_workers)
+        responses = helpers.FrameRingGroup(
+            sniffer_workers, RESPONSE_RING_SLOTS, RESPONSE_RING_SLOT_SIZE
+        )
         boot_time = datetime.now().timestamp()
 
-        lock = mp.Lock()
-        sequence_number = mp.Value("i", 0)
+        # built once here and shared read-only instead of per process
+        fakeap_config = helpers.FakeAPConfig.from_config(config)
+        frame_ies = mp.RawArray("c", bytes(helpers.build_fake_frame_ies(config)))
+
+        # each Tx process counts its own 802.11 sequence numbers from its own
+        # seed instead of sharing one counter across processes
+        sequence_seeds = helpers.spread_sequence_seeds(2)
 
         if args.no_interface_prep:
             log.warning("skipping interface prep...")
@@ -140,6 +161,9 @@ def start(args: argparse.Namespace):
                 sys.exit(-1)
             log.debug("finish interface prep...")
 
+        # read once here; the children only build frames from it
+        mac = helpers.get_mac(interface)
+
         helpers.generate_run_message(config)
 
         if listen_only:
@@ -149,19 +173,54 @@ def start(args: argparse.Namespace):
             txbeacons = mp.Process(
                 name="txbeacons",
                 target=TxBeacons,
-                args=(config, boot_time, lock, sequence_number),
+                args=(
+                    fakeap_config,
+                    boot_time,
+                    sequence_seeds[0],
+                    mac,
+                    frame_ies,
+                    beacon_cpu,
+                ),
             )
             processes.append(txbeacons)
             txbeacons.start()
 
-        log.debug("sniffer process")
-        sniffer = mp.Process(
-            name="sniffer",
-            target=Sniffer,
-            args=(config, boot_time, lock, sequence_number, queue, args),
+        log.debug("sniffer tx process")
+        sniffer_tx = mp.Process(
+            name="sniffertx",
+            target=SnifferTx,
+            args=(
+                fakeap_config,
+                sequence_seeds[1],
+                mac,
+                frame_ies,
+                responses,
+                sniffer_tx_cpu,
+            ),
         )
-        processes.append(sniffer)
-        sniffer.start()
+        processes.append(sniffer_tx)
+        sniffer_tx.start()
+
+        # sniffers share one PACKET_FANOUT group, each on its own core and rings
+        fanout_id = parent_pid & 0xFFFF
+        for worker in range(sniffer_workers):
+            log.debug("sniffer process %s", worker)
+            sniffer = mp.Process(
+                name=f"sniffer{worker}",
+                target=SnifferRx,
+                args=(
+                    fakeap_config,
+                    boot_time,
+                    mac,
+                    queue.rings[worker],
+                    responses.rings[worker],
+                    args,
+                    fanout_id,
+                    cpus[-1 - worker],
+                ),
+            )
+            processes.append(sniffer)
+            sniffer.start()
 
     from .profiler import Profiler
 
@@ -26,7 +26,7 @@ from typing import List, Tuple
 
 # third party imports
 from manuf import manuf
-from scapy.all import Dot11, RadioTap, wrpcap
+from scapy.all import RadioTap, wrpcap
 
 # app imports
 from .__version__ import __version__
@@ -79,23 +79,23 @@ class Profiler(object):
                 frame = queue.get()
 
                 if frame:
-                    if isinstance(frame, RadioTap) or isinstance(frame, Dot11):
-                        if frame.addr2 in buffer:
-                            toc = time.time() - buffer[frame.addr2]
-                            if toc < buffer_squelch:
-                                self.log.debug(
-                                    "suppressing %s as %s is less than squelch (%s)",
-                                    frame.addr2,
-                                    f"{toc:.2f}",
-                                    buffer_squelch,
-                                )
-                                continue
-                            else:
-                                buffer[frame.addr2] = time.time()
+                    frame = RadioTap(frame)
+                    if frame.addr2 in buffer:
+                        toc = time.time() - buffer[frame.addr2]
+                        if toc < buffer_squelch:
+                            self.log.debug(
+                                "suppressing %s as %s is less than squelch (%s)",
+                                frame.addr2,
+                                f"{toc:.2f}",
+                                buffer_squelch,
+                            )
+                            continue
                         else:
                             buffer[frame.addr2] = time.time()
+                    else:
+                        buffer[frame.addr2] = time.time()
 
-                        self.profile(frame)
+                    self.profile(frame)
 
                 if queue.empty():
                     # if nothing is left in the queue and we're only analyzing a pcap file
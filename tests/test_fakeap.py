@@ -1 +1,215 @@
 # -*- coding: utf-8 -*-
+
+import socket
+from collections import OrderedDict
+
+import pytest
+from scapy.all import (Dot11, Dot11AssoReq, Dot11Auth, Dot11Beacon, Dot11Elt,
+                       Dot11ProbeReq, Dot11ReassoReq, RadioTap)
+
+from profiler import fakeap, helpers
+from profiler.constants import (ADDRESSED_FRAME_CACHE_SIZE,
+                                RESPONSE_RING_SLOT_SIZE, RESPONSE_RING_SLOTS)
+
+MAC = "02:11:22:33:44:55"
+STATION = "aa:bb:cc:00:00:01"
+OTHER = "02:99:99:99:99:99"
+BROADCAST = "ff:ff:ff:ff:ff:ff"
+
+
+def mac_bytes(mac):
+    return bytes.fromhex(mac.replace(":", ""))
+
+
+def probe_req(*elements):
+    frame = (
+        RadioTap()
+        / Dot11(subtype=4, addr1=BROADCAST, addr2=STATION, addr3=BROADCAST)
+        / Dot11ProbeReq()
+    )
+    for element in elements:
+        frame /= element
+    return bytes(frame)
+
+
+def auth(receiver):
+    return bytes(
+        RadioTap()
+        / Dot11(subtype=11, addr1=receiver, addr2=STATION, addr3=receiver)
+        / Dot11Auth(seqnum=1)
+    )
+
+
+def assoc_req(receiver, layer=Dot11AssoReq):
+    subtype = 2 if layer is Dot11ReassoReq else 0
+    return bytes(
+        RadioTap()
+        / Dot11(subtype=subtype, addr1=receiver, addr2=STATION, addr3=receiver)
+        / layer()
+        / Dot11Elt(ID=0, info=b"WLAN Pi")
+    )
+
+
+class TestFakeAP:
+    @staticmethod
+    def build_sniffer(listen_only=False):
+        """ build the receive path of a SnifferRx without sockets or a process """
+        sniffer = fakeap.SnifferRx.__new__(fakeap.SnifferRx)
+        sniffer.listen_only = listen_only
+        sniffer._mac_bytes = mac_bytes(MAC)
+        sniffer._mac_int = int.from_bytes(sniffer._mac_bytes, "big")
+        sniffer._ssid_bytes = b"WLAN Pi"
+        sniffer._ssid_length = len(sniffer._ssid_bytes)
+        sniffer.probes, sniffer.auths, sniffer.assocs = [], [], []
+        sniffer.dot11_probe_request_cb = sniffer.probes.append
+        sniffer.dot11_auth_cb = sniffer.auths.append
+        sniffer.dot11_assoc_request_cb = sniffer.assocs.append
+        sniffer.build_dispatch_table()
+        return sniffer
+
+    @staticmethod
+    def build_sniffer_tx():
+        """ build a SnifferTx that sends over a socketpair """
+        sniffer_tx = fakeap.SnifferTx.__new__(fakeap.SnifferTx)
+        sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sniffer_tx.l2socket = type("L2Socket", (), {"outs": sender})
+        sniffer_tx.sequence_number = helpers.SequenceNumber(0)
+        sniffer_tx.tx_frames = []
+        return sniffer_tx, receiver
+
+    @classmethod
+    def build_sniffer_tx_responders(cls, responses):
+        """ build a SnifferTx that answers the requests in responses """
+        sniffer_tx, receiver = cls.build_sniffer_tx()
+        sniffer_tx.responses = responses
+        sniffer_tx._probe_response_bytes = bytearray(fakeap.PROBE_RESPONSE_TEMPLATE)
+        sniffer_tx._probe_response_addr1_offset = 12
+        sniffer_tx._probe_response_seqctl_offset = 30
+        sniffer_tx._auth_bytes = bytearray(fakeap.AUTH_TEMPLATE)
+        sniffer_tx._auth_addr1_offset = 12
+        sniffer_tx._auth_seqctl_offset = 30
+        sniffer_tx._probe_response_cache = OrderedDict()
+        sniffer_tx._auth_cache = OrderedDict()
+        sniffer_tx._responders = {
+            fakeap.PROBE_RESPONSE_KIND[0]: sniffer_tx.probe_response,
+            fakeap.AUTH_KIND[0]: sniffer_tx.auth,
+        }
+        return sniffer_tx, receiver
+
+    @pytest.mark.parametrize(
+        "frame,probes,auths,assocs",
+        [
+            (probe_req(Dot11Elt(ID=0, info=b"WLAN Pi")), 1, 0, 0),
+            (auth(MAC), 0, 1, 0),
+            (assoc_req(MAC), 0, 0, 1),
+            (assoc_req(MAC, Dot11ReassoReq), 0, 0, 1),
+            (
+                bytes(
+                    RadioTap()
+                    / Dot11(subtype=8, addr1=BROADCAST, addr2=MAC, addr3=MAC)
+                    / Dot11Beacon()
+                ),
+                0,
+                0,
+                0,
+            ),
+            (bytes(RadioTap() / Dot11(type=2, addr1=MAC, addr2=STATION)), 0, 0, 0),
+            (auth(MAC)[:30], 0, 0, 0),
+        ],
+    )
+    def test_received_frame_dispatch(self, frame, probes, auths, assocs):
+        sniffer = self.build_sniffer()
+        sniffer.received_frame(frame)
+        assert len(sniffer.probes) == probes
+        assert len(sniffer.auths) == auths
+        assert len(sniffer.assocs) == assocs
+
+    @pytest.mark.parametrize(
+        "frame,expected",
+        [
+            (probe_req(Dot11Elt(ID=0, info=b"WLAN Pi")), True),
+            (probe_req(Dot11Elt(ID=0, info=b""), Dot11Elt(ID=1, info=b"\x82")), True),
+            (probe_req(Dot11Elt(ID=0, info=b"WLAN Px")), False),
+            (probe_req(Dot11Elt(ID=0, info=b"WLAN")), False),
+            (probe_req(Dot11Elt(ID=1, info=b"\x82"), Dot11Elt(ID=0, info=b"")), False),
+            (probe_req(), False),
+            (probe_req(Dot11Elt(ID=0, info=b"WLAN Pi"))[:33], False),
+        ],
+    )
+    def test_received_probe_req(self, frame, expected):
+        sniffer = self.build_sniffer()
+        sniffer.received_frame(frame)
+        assert sniffer.probes == ([mac_bytes(STATION)] if expected else [])
+
+    @pytest.mark.parametrize("receiver,expected", [(MAC, True), (OTHER, False)])
+    def test_received_auth(self, receiver, expected):
+        for listen_only in (False, True):
+            sniffer = self.build_sniffer(listen_only)
+            sniffer.received_frame(auth(receiver))
+            assert sniffer.auths == ([mac_bytes(STATION)] if expected else [])
+
+    @pytest.mark.parametrize(
+        "receiver,listen_only,expected",
+        [
+            (MAC, False, True),
+            (OTHER, False, False),
+            (MAC, True, True),
+            (OTHER, True, True),
+        ],
+    )
+    def test_received_assoc_req(self, receiver, listen_only, expected):
+        sniffer = self.build_sniffer(listen_only)
+        frame = assoc_req(receiver)
+        sniffer.received_frame(frame)
+        assert sniffer.assocs == ([frame] if expected else [])
+
+    def test_get_addressed_frame(self):
+        cache = OrderedDict()
+        template = bytearray(32)
+        receivers = [
+            bytes([2, 0, 0, 0, 0, n]) for n in range(ADDRESSED_FRAME_CACHE_SIZE)
+        ]
+        for receiver in receivers:
+            frame = fakeap.SnifferTx.get_addressed_frame(cache, template, 4, receiver)
+            assert bytes(frame[4:10]) == receiver
+        assert template == bytearray(32)
+        # a hit returns the cached copy and makes it the most recently used
+        first = fakeap.SnifferTx.get_addressed_frame(cache, template, 4, receivers[0])
+        assert first is cache[receivers[0]]
+        fakeap.SnifferTx.get_addressed_frame(cache, template, 4, b"\x02" * 6)
+        assert len(cache) == ADDRESSED_FRAME_CACHE_SIZE
+        assert receivers[0] in cache
+        assert receivers[1] not in cache
+
+    def test_queue_tx_frame(self):
+        sniffer_tx, receiver = self.build_sniffer_tx()
+        frame = memoryview(bytearray(32))
+        for sequence_number in (1, 2, 3):
+            sniffer_tx.queue_tx_frame(frame, 30, sequence_number)
+        sniffer_tx.flush_tx_frames()
+        sent = [receiver.recv(64) for _ in range(3)]
+        assert [int.from_bytes(f[30:32], "little") >> 4 for f in sent] == [1, 2, 3]
+        sniffer_tx.l2socket.outs.close()
+        receiver.close()
+
+    def test_queue_responses(self):
+        responses = helpers.FrameRingGroup(
+            2, RESPONSE_RING_SLOTS, RESPONSE_RING_SLOT_SIZE
+        )
+        sniffer_tx, receiver = self.build_sniffer_tx_responders(responses)
+        stations = [mac_bytes(f"aa:bb:cc:00:00:0{n}") for n in range(1, 4)]
+        assert responses.rings[0].put(fakeap.PROBE_RESPONSE_KIND + stations[0])
+        assert responses.rings[0].put(fakeap.PROBE_RESPONSE_KIND + stations[1])
+        assert responses.rings[1].put(fakeap.AUTH_KIND + stations[2])
+        sniffer_tx.queue_responses(responses.get())
+        assert responses.empty()
+        # every request is answered in a single sendmmsg batch
+        assert len(sniffer_tx.tx_frames) == 3
+        sniffer_tx.flush_tx_frames()
+        sent = [receiver.recv(512) for _ in range(3)]
+        # the rings are read round robin; auths reuse the sequence number before
+        assert [RadioTap(f)[Dot11].subtype for f in sent] == [5, 11, 5]
+        assert [f[12:18] for f in sent] == [stations[0], stations[2], stations[1]]
+        assert [int.from_bytes(f[30:32], "little") >> 4 for f in sent] == [1, 1, 3]
+        sniffer_tx.l2socket.outs.close()
+        receiver.close()
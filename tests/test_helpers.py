@@ -2,10 +2,14 @@
 
 import logging
 import multiprocessing as mp
+import socket
+import time
 
 import pytest
+from scapy.all import Dot11, RadioTap, rdpcap, wrpcap
 
 from profiler import helpers
+from profiler.constants import _20MHZ_CHANNEL_LIST
 
 
 class TestHelpers:
@@ -31,6 +35,18 @@ class TestHelpers:
     def test_next_sequence_number(self, seq, expected):
         assert helpers.next_sequence_number(seq) == expected
 
+    @pytest.mark.parametrize("seed,expected", [(0, 1), (2048, 2049), (4095, 0)])
+    def test_sequence_number(self, seed, expected):
+        seq = helpers.SequenceNumber(seed)
+        assert helpers.next_sequence_number(seq) == expected
+        assert seq.value == expected
+
+    @pytest.mark.parametrize(
+        "count,expected", [(1, [0]), (2, [0, 2048]), (3, [0, 1365, 2730])]
+    )
+    def test_spread_sequence_seeds(self, count, expected):
+        assert helpers.spread_sequence_seeds(count) == expected
+
     def test_generate_run_message(self):
         conf1 = {
             "GENERAL": {
@@ -97,6 +113,94 @@ class TestHelpers:
         resp = helpers.get_frequency_bytes(channel)
         assert resp == expected
 
+    @pytest.mark.parametrize(
+        "frame,expected",
+        [
+            (b"\x00\x00\x08\x00\x00\x00\x00\x00", 8),
+            (b"\x00\x00\x38\x00\x2f\x40\x40\xa0", 56),
+        ],
+    )
+    def test_get_radiotap_length(self, frame, expected):
+        assert helpers.get_radiotap_length(frame) == expected
+
+    @pytest.mark.parametrize(
+        "ssid,expected",
+        [
+            (
+                "WLAN Pi",
+                "wlan[24] = 0 and (wlan[25] = 0 or (wlan[25] = 7 and wlan[26:4] = 0x574c414e and wlan[30:2] = 0x2050 and wlan[32:1] = 0x69))",
+            ),
+            (
+                "ab",
+                "wlan[24] = 0 and (wlan[25] = 0 or (wlan[25] = 2 and wlan[26:2] = 0x6162))",
+            ),
+        ],
+    )
+    def test_build_ssid_bpf_filter(self, ssid, expected):
+        assert helpers.build_ssid_bpf_filter(ssid) == expected
+
+    def test_fill_frame_template(self):
+        template = b"\x00\x00\x08\x00\x00\x00\x00\x00" + b"\x80\x00" * 2 + b"\xff" * 6
+        template += b"\xaa" * 12 + b"\x00\x00"
+        frame = helpers.fill_frame_template(template, b"\x02\x11\x22\x33\x44\x55", b"ie")
+        assert frame[18:30] == b"\x02\x11\x22\x33\x44\x55" * 2
+        assert frame[:18] == template[:18]
+        assert frame[30:] == b"\x00\x00ie"
+
+    def test_send_frames(self):
+        sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        frames = [bytearray(b"one"), bytearray(b"two"), bytearray(b"three")]
+        helpers.send_frames(sender, frames)
+        assert [receiver.recv(16) for _ in frames] == frames
+        sender.close()
+        receiver.close()
+
+    def test_sleep_until(self):
+        deadline = time.monotonic_ns() + 20_000_000
+        helpers.sleep_until(deadline)
+        assert time.monotonic_ns() >= deadline
+        # deadlines in the past return immediately
+        helpers.sleep_until(deadline - 1_000_000_000)
+
+    def test_frame_ring(self):
+        ring = helpers.FrameRing(slots=2, slot_size=8)
+        assert ring.empty()
+        assert ring.put(b"\x01\x02")
+        assert ring.put(b"123456")
+        assert not ring.put(b"full")
+        assert ring.get() == b"\x01\x02"
+        assert not ring.put(b"1234567")
+        assert ring.put(b"")
+        assert ring.get() == b"123456"
+        assert ring.get() == b""
+        assert ring.empty()
+        assert ring.get(timeout=0.01) is None
+        with pytest.raises(ValueError):
+            helpers.FrameRing(slots=3)
+
+    def test_frame_ring_group(self):
+        group = helpers.FrameRingGroup(2, slots=2, slot_size=8)
+        assert group.empty()
+        assert group.rings[1].put(b"b1")
+        assert group.rings[0].put(b"a1")
+        assert group.rings[1].put(b"b2")
+        assert sorted(group.get() for _ in range(3)) == [b"a1", b"b1", b"b2"]
+        assert group.empty()
+        assert group.get(timeout=0.01) is None
+
+    def test_get_assoc_reqs(self, tmp_path, caplog):
+        frames = rdpcap("./tests/pcaps/ax210_and_iphone12promax.pcap")
+        assoc_reqs = helpers.get_assoc_reqs(frames)
+        assert assoc_reqs == [bytes(frame) for frame in frames]
+        for assoc_req in assoc_reqs:
+            assert RadioTap(assoc_req).ChannelFrequency in _20MHZ_CHANNEL_LIST
+        # DLT_IEEE802_11 carries no radiotap channel for the profiler to report
+        pcap = str(tmp_path / "dot11.pcap")
+        wrpcap(pcap, [frame[Dot11] for frame in frames])
+        with caplog.at_level(logging.WARNING):
+            assert helpers.get_assoc_reqs(rdpcap(pcap)) == []
+        assert caplog.text.count("unsupported link type") == 2
+
     def test_build_fake_frame_ies(self):
         conf = {
             "GENERAL": {
@@ -115,6 +219,18 @@ class TestHelpers:
 
         assert frame_bytes == known
 
+    def test_fakeap_config(self):
+        conf = {
+            "GENERAL": {
+                "ssid": "WLAN Pi",
+                "channel": "36",
+                "interface": "wlan1",
+                "files_path": "/var/www/html/profiler",
+            }
+        }
+        fakeap_config = helpers.FakeAPConfig.from_config(conf)
+        assert fakeap_config == helpers.FakeAPConfig("WLAN Pi", "wlan1", 36, False)
+
     @pytest.mark.parametrize(
         "channel,expected",
         [